@@ -0,0 +1,42 @@
+# backend/app/lib/documents.py
+import hashlib
+from pathlib import Path
+
+# Shared by the /admin/ingest job and scripts/build_corpus.py so both write
+# the same chunks and metadata into Chroma
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SUPPORTED_SUFFIXES = {".pdf", ".md", ".markdown", ".txt"}
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file in 1 MiB blocks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def load_documents(path: str):
+    """Load a PDF, Markdown or text file into LangChain documents."""
+    from langchain_community.document_loaders import PyMuPDFLoader, TextLoader
+
+    # PDFs go through PyMuPDF (already a requirement); Markdown is chunked as
+    # plain text rather than pulling in `unstructured`
+    if Path(path).suffix.lower() == ".pdf":
+        loader = PyMuPDFLoader(path)
+    else:
+        loader = TextLoader(path, encoding="utf-8")
+    return loader.load()
+
+
+def split_documents(docs, source: str):
+    """Chunk documents and stamp each chunk with its source label."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = splitter.split_documents(docs)
+    for chunk in chunks:
+        chunk.metadata["source"] = source
+    return chunks
@@ -0,0 +1,336 @@
+# backend/app/lib/llm_gateway.py
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
+# Gateway configuration, all overridable from the environment
+LLM_PRIMARY = os.getenv("LLM_PRIMARY", "openai")
+LLM_SECONDARY = os.getenv("LLM_SECONDARY", "")
+LLM_DEMO_BACKEND = os.getenv("LLM_DEMO_BACKEND", "")
+LLM_HEDGE_SECONDS = float(os.getenv("LLM_HEDGE_SECONDS", "4"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+OPENAI_FAST_MODEL = os.getenv("OPENAI_FAST_MODEL", "gpt-3.5-turbo")
+LLAMA_MODEL_PATH = os.getenv("LLAMA_MODEL_PATH", "app/data/models/model.gguf")
+# Calls each backend may have running at once. Past this a hedge or failover
+# skips the backend; the last backend left to try waits for a free slot.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+
+# Circuit breaker settings
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN_SECONDS = 30
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when no backend could produce an answer."""
+
+
+class OpenAIChatBackend:
+    """OpenAI chat completion model via langchain-openai."""
+
+    def __init__(self, model: str):
+        from langchain_openai import ChatOpenAI
+
+        self.llm = ChatOpenAI(model=model, timeout=LLM_TIMEOUT_SECONDS, max_retries=0)
+
+    def generate(self, prompt: str) -> tuple[str, int]:
+        message = self.llm.invoke(prompt)
+        usage = getattr(message, "usage_metadata", None) or {}
+        return message.content, usage.get("total_tokens", 0)
+
+
+class LlamaCppBackend:
+    """Local CPU model served in-process by llama.cpp (requires llama-cpp-python)."""
+
+    def __init__(self, model_path: str):
+        from langchain_community.llms import LlamaCpp
+
+        self.llm = LlamaCpp(model_path=model_path, n_ctx=4096, temperature=0)
+        # llama.cpp contexts are not thread safe
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> tuple[str, int]:
+        with self._lock:
+            text = self.llm.invoke(prompt)
+            tokens = self.llm.get_num_tokens(prompt) + self.llm.get_num_tokens(text)
+        return text, tokens
+
+
+class StubBackend:
+    """Deterministic backend for tests and local development, no network needed."""
+
+    def generate(self, prompt: str) -> tuple[str, int]:
+        lines = [line for line in prompt.splitlines() if line.startswith("Question:")]
+        question = lines[-1][len("Question:"):].strip() if lines else prompt.strip()
+        text = f"[stub] {question}"
+        return text, len(prompt.split()) + len(text.split())
+
+
+def _build_backend(name: str):
+    if name == "openai":
+        return OpenAIChatBackend(OPENAI_CHAT_MODEL)
+    if name == "openai-fast":
+        return OpenAIChatBackend(OPENAI_FAST_MODEL)
+    if name == "llamacpp":
+        return LlamaCppBackend(LLAMA_MODEL_PATH)
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+class CircuitBreaker:
+    """
+    Tracks the error rate over the last BREAKER_WINDOW calls. Once it crosses
+    BREAKER_ERROR_RATE the breaker opens and the backend is skipped until the
+    cooldown has elapsed, after which a single trial call is let through.
+    Only that trial's outcome closes or re-opens the breaker; results from
+    calls started before it opened are ignored.
+    """
+
+    def __init__(self):
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= BREAKER_COOLDOWN_SECONDS:
+            return "half-open"
+        return "open"
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def acquire(self) -> Optional[str]:
+        """
+        Ask to make a call. Returns "closed" for a normal call, "trial" for the
+        half-open trial call, or None if the call must not be made.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return "closed"
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return "trial"
+            return None
+
+    def release_trial(self):
+        """Give back a trial that was acquired but never made."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, ok: bool, ticket: str):
+        with self._lock:
+            if ticket == "trial":
+                self._trial_in_flight = False
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            if self._opened_at is not None:
+                # Late result from a call started before the breaker opened
+                return
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= BREAKER_MIN_CALLS
+                    and failures / len(self._outcomes) >= BREAKER_ERROR_RATE):
+                self._opened_at = time.monotonic()
+
+
+class _BackendSlot:
+    """
+    A lazily constructed backend plus its breaker, metrics and its own
+    executor, so a slow backend can only tie up its own workers.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker()
+        self._backend = None
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(LLM_MAX_IN_FLIGHT)
+        self._pool = ThreadPoolExecutor(max_workers=LLM_MAX_IN_FLIGHT, thread_name_prefix=f"llm-{name}")
+        self.calls = 0
+        self.errors = 0
+        self.hedged = 0
+        self.shed = 0
+        self.tokens = 0
+        self.latencies = deque(maxlen=500)
+
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = _build_backend(self.name)
+            return self._backend
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+
+    def submit(self, prompt: str, wait_until: Optional[float] = None) -> Optional[Future]:
+        """
+        Start a call on this backend's executor. Returns None without queueing
+        anything if its breaker is open, or if the backend is at
+        LLM_MAX_IN_FLIGHT and no slot frees up by `wait_until` (a
+        time.monotonic() deadline; None means don't wait at all).
+        """
+        if wait_until is None:
+            acquired = self._in_flight.acquire(blocking=False)
+        else:
+            acquired = self._in_flight.acquire(timeout=max(0.0, wait_until - time.monotonic()))
+        if not acquired:
+            with self._lock:
+                self.shed += 1
+            return None
+        ticket = self.breaker.acquire()
+        if ticket is None:
+            self._in_flight.release()
+            return None
+        try:
+            return self._pool.submit(self._run, prompt, ticket)
+        except BaseException:
+            if ticket == "trial":
+                self.breaker.release_trial()
+            self._in_flight.release()
+            raise
+
+    def _run(self, prompt: str, ticket: str) -> str:
+        try:
+            return self.generate(prompt, ticket)
+        finally:
+            self._in_flight.release()
+
+    def generate(self, prompt: str, ticket: str = "closed") -> str:
+        start = time.perf_counter()
+        try:
+            text, tokens = self.backend().generate(prompt)
+        except Exception:
+            with self._lock:
+                self.calls += 1
+                self.errors += 1
+            self.breaker.record(False, ticket)
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens
+            self.latencies.append(elapsed)
+        self.breaker.record(True, ticket)
+        return text
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            calls, errors, hedged, shed, tokens = self.calls, self.errors, self.hedged, self.shed, self.tokens
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "calls": calls,
+            "errors": errors,
+            "hedged": hedged,
+            "shed": shed,
+            "tokens": tokens,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+            "breaker": self.breaker.state,
+        }
+
+
+class LLMGateway:
+    """
+    Routes a prompt to a primary backend, hedging to a secondary one if the
+    primary has not answered within LLM_HEDGE_SECONDS (or failing over straight
+    away if it errors, is saturated or its breaker is open). The first answer wins.
+    """
+
+    def __init__(self, primary: str, secondary: str = "", routes: Optional[dict] = None):
+        self.primary = primary
+        self.secondary = secondary or None
+        self.routes = {role: name for role, name in (routes or {}).items() if name}
+        self._slots: dict[str, _BackendSlot] = {}
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, name: str) -> _BackendSlot:
+        with self._slots_lock:
+            if name not in self._slots:
+                self._slots[name] = _BackendSlot(name)
+            return self._slots[name]
+
+    def _candidates(self, role: Optional[str]) -> list[_BackendSlot]:
+        names = [self.routes.get(role, self.primary)]
+        for fallback in (self.primary, self.secondary):
+            if fallback and fallback not in names:
+                names.append(fallback)
+        return [self._slot(name) for name in names]
+
+    def generate(self, prompt: str, role: Optional[str] = None) -> str:
+        candidates = self._candidates(role)
+        deadline = time.monotonic() + LLM_TIMEOUT_SECONDS
+        pending = {}
+        errors = []
+
+        def launch_next() -> Optional[_BackendSlot]:
+            # Skip backends that are saturated or whose breaker is open, unless
+            # it is the last one and nothing else is running: then wait for it
+            while candidates:
+                slot = candidates.pop(0)
+                last_resort = not candidates and not pending
+                future = slot.submit(prompt, wait_until=deadline if last_resort else None)
+                if future is not None:
+                    pending[future] = slot
+                    return slot
+            return None
+
+        if launch_next() is None:
+            raise LLMUnavailableError("No LLM backend available")
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Only wait the hedge interval while there is someone left to hedge to
+            timeout = min(LLM_HEDGE_SECONDS, remaining) if candidates else remaining
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                slot = launch_next()
+                if slot is not None:
+                    slot.record_hedge()
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(e)
+            if not pending:
+                launch_next()
+
+        if pending:
+            raise LLMUnavailableError("LLM request timed out")
+        raise LLMUnavailableError(f"All LLM backends failed: {errors[-1] if errors else 'no backend'}")
+
+    def metrics(self) -> dict:
+        with self._slots_lock:
+            slots = list(self._slots.values())
+        return {slot.name: slot.metrics() for slot in slots}
+
+
+gateway = LLMGateway(
+    primary=LLM_PRIMARY,
+    secondary=LLM_SECONDARY,
+    routes={"demo": LLM_DEMO_BACKEND},
+)
@@ -3,9 +3,10 @@ from app.routers.register import router as register_router
 from app.routers.ingest import router as ingest_router
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException
 from pydantic import BaseModel
-from app.models import qa_chain
+from app.models import answer_question
+from app.lib.llm_gateway import gateway, LLMUnavailableError
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth import get_current_role
 
@@ -46,5 +47,16 @@ def verify_auth(role: str = Depends(get_current_role)):
 
 @app.post("/chat")
 def chat(query: Query, role: str = Depends(get_current_role)):
-    answer = qa_chain.run(query.question)
+    try:
+        answer = answer_question(query.question, role)
+    except LLMUnavailableError:
+        raise HTTPException(status_code=503, detail="Model temporarily unavailable")
     return {"answer": answer}
+
+
+@app.get("/admin/llm/metrics")
+def llm_metrics(role: str = Depends(get_current_role)):
+    """Per-backend latency, token, error and circuit breaker stats"""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    return gateway.metrics()
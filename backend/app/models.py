@@ -1,8 +1,9 @@
 # backend/app/models.py
+from typing import Optional
 from langchain.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
-from langchain.chains import RetrievalQA
-from langchain.llms import OpenAI
+
+from app.lib.llm_gateway import gateway
 
 # Paths
 from pathlib import Path
@@ -15,9 +16,23 @@ vector_store = Chroma(
     persist_directory=str(PERSIST_DIR),
     embedding_function=embeddings
 )
+retriever = vector_store.as_retriever()
+
+# Same "stuff" prompt RetrievalQA used, so answers read the same across backends
+PROMPT_TEMPLATE = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+
 
-# Build a RetrievalQA chain
-qa_chain = RetrievalQA.from_chain_type(
-    llm=OpenAI(),
-    retriever=vector_store.as_retriever()
-)
\ No newline at end of file
+def answer_question(question: str, role: Optional[str] = None) -> str:
+    """
+    Retrieve context for the question and answer it through the LLM gateway,
+    which picks the backend for this role and handles hedging/failover.
+    """
+    docs = retriever.invoke(question)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    prompt = PROMPT_TEMPLATE.format(context=context, question=question)
+    return gateway.generate(prompt, role=role)
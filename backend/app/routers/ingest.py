@@ -1,95 +1,381 @@
 import os
-import shutil
+import asyncio
+import hashlib
+import tempfile
+import time
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
+from typing import List, Optional
+from fastapi.routing import APIRoute
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks, Request
+from starlette.concurrency import run_in_threadpool
 import uuid
 from langchain.schema import Document
 
 from app.auth import get_current_role
+from app.lib.documents import load_documents, split_documents
 
 
 CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "app/data/chroma_db")
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", Path(tempfile.gettempdir()) / "illm_uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 10))
+# Whole-request cap, enforced while the body is received (before multipart parsing)
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES * MAX_BATCH_FILES
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", 6 * 60 * 60))
 ingest_jobs: dict = {}
+# In-progress resumable uploads, keyed by upload_id
+upload_sessions: dict = {}
+# Temp files handed to a queued job, which the job deletes when it finishes
+queued_paths: set = set()
 
 
-def _process_ingestion(job_id: str, temp_path: Optional[str], text: Optional[str], source: str):
-    from langchain.document_loaders import PyPDFLoader, TextLoader, UnstructuredMarkdownLoader
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
+def _is_duplicate(db, sha256: str) -> bool:
+    existing = db.get(where={"content_hash": sha256}, limit=1)
+    return bool(existing.get("ids"))
+
+
+def _process_ingestion(job_id: str, uploads: List[dict], text: Optional[str], source: str):
     from langchain_openai import OpenAIEmbeddings
     from langchain_community.vectorstores import Chroma
-    from pathlib import Path
 
     try:
+        embeddings = OpenAIEmbeddings()
+        db = Chroma(persist_directory=CHROMA_DB_DIR, embedding_function=embeddings)
+
         docs = []
-        if temp_path:
-            suffix = Path(temp_path).suffix.lower()
-            if suffix == ".pdf":
-                loader = PyPDFLoader(temp_path)
-            elif suffix in {".md", ".markdown"}:
-                loader = UnstructuredMarkdownLoader(temp_path)
-            else:
-                loader = TextLoader(temp_path)
-            docs.extend(loader.load())
+        duplicates = []
+        accepted = set()
+        for upload in uploads:
+            # Skip files whose bytes are already in the store (or earlier in
+            # this batch) before parsing them
+            if upload["sha256"] in accepted or _is_duplicate(db, upload["sha256"]):
+                duplicates.append(upload["filename"])
+                continue
+            accepted.add(upload["sha256"])
+            for doc in load_documents(upload["path"]):
+                doc.metadata["content_hash"] = upload["sha256"]
+                docs.append(doc)
 
         if text:
             docs.append(Document(page_content=text, metadata={}))
 
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = splitter.split_documents(docs)
-        for chunk in chunks:
-            chunk.metadata["source"] = source
+        chunks = split_documents(docs, source)
 
-        embeddings = OpenAIEmbeddings()
-        db = Chroma(persist_directory=CHROMA_DB_DIR, embedding_function=embeddings)
-        db.add_documents(chunks)
-        db.persist()
+        if chunks:
+            db.add_documents(chunks)
+            db.persist()
 
-        ingest_jobs[job_id] = {"status": "completed", "num_chunks": len(chunks)}
+        ingest_jobs[job_id] = {
+            "status": "completed",
+            "num_chunks": len(chunks),
+            "skipped_duplicates": duplicates,
+        }
     except Exception as e:
         ingest_jobs[job_id] = {"status": "failed", "error": str(e)}
+    finally:
+        for upload in uploads:
+            Path(upload["path"]).unlink(missing_ok=True)
+            queued_paths.discard(upload["path"])
+
+
+async def _save_upload(file: UploadFile) -> dict:
+    """
+    Copy an UploadFile to disk in chunks, hashing as we go. Disk writes run
+    in the threadpool so large uploads don't block the event loop.
+    Raises 413 (and removes the partial file) if the file exceeds
+    MAX_UPLOAD_BYTES; the request as a whole was already capped at
+    MAX_REQUEST_BYTES by _LimitedBodyRoute while it was being received.
+    """
+    await run_in_threadpool(UPLOAD_DIR.mkdir, parents=True, exist_ok=True)
+    path = UPLOAD_DIR / f"{uuid.uuid4()}{Path(file.filename or '').suffix.lower()}"
+    hasher = hashlib.sha256()
+    size = 0
+    out = await run_in_threadpool(open, path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"{file.filename} exceeds upload limit")
+            hasher.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        out.close()
+        await run_in_threadpool(path.unlink, missing_ok=True)
+        raise
+    finally:
+        await file.close()
+    out.close()
+    return {"path": str(path), "filename": file.filename, "sha256": hasher.hexdigest(), "size": size}
+
+
+def _queue_job(background_tasks: BackgroundTasks, uploads: List[dict], text: Optional[str], source: str) -> dict:
+    job_id = str(uuid.uuid4())
+    ingest_jobs[job_id] = {"status": "queued"}
+    queued_paths.update(u["path"] for u in uploads)
+    background_tasks.add_task(_process_ingestion, job_id, uploads, text, source)
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "files": [{"filename": u["filename"], "sha256": u["sha256"], "size": u["size"]} for u in uploads],
+    }
+
+
+def _remove_upload_files(expired: List[str], owned: set, remove_all: bool, now: float):
+    for path in expired:
+        Path(path).unlink(missing_ok=True)
+    if not UPLOAD_DIR.exists():
+        return
+    for path in UPLOAD_DIR.iterdir():
+        if str(path) in owned:
+            continue
+        try:
+            if remove_all or now - path.stat().st_mtime >= UPLOAD_SESSION_TTL_SECONDS:
+                path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+async def _sweep_uploads(remove_all: bool = False):
+    """
+    Delete resumable sessions idle for longer than UPLOAD_SESSION_TTL_SECONDS,
+    plus any file in UPLOAD_DIR that no live session or queued job owns and is
+    older than the TTL. With remove_all (startup) every file is an orphan,
+    since sessions and jobs only live in this process's memory.
+    Session bookkeeping stays on the event loop; file I/O runs in the threadpool.
+    """
+    now = time.time()
+    expired = []
+    for upload_id, session in list(upload_sessions.items()):
+        if session["lock"].locked() or now - session["updated_at"] < UPLOAD_SESSION_TTL_SECONDS:
+            continue
+        upload_sessions.pop(upload_id, None)
+        expired.append(session["path"])
+
+    owned = {session["path"] for session in upload_sessions.values()}
+    owned.update(set(queued_paths))
+    await run_in_threadpool(_remove_upload_files, expired, owned, remove_all, now)
+
+
+async def _sweep_uploads_periodically():
+    while True:
+        await asyncio.sleep(min(UPLOAD_SESSION_TTL_SECONDS, 15 * 60))
+        await _sweep_uploads()
+
+
+class _LimitedBodyRoute(APIRoute):
+    """
+    Rejects request bodies over MAX_REQUEST_BYTES with a 413: up front from
+    Content-Length, and otherwise as soon as that many bytes have been
+    received. FastAPI parses multipart bodies before the endpoint runs, so
+    this has to happen at the route level rather than in the handler.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request):
+            length = request.headers.get("content-length")
+            if length and length.isdigit() and int(length) > MAX_REQUEST_BYTES:
+                raise HTTPException(status_code=413, detail="Request body too large")
+
+            received = 0
+            receive = request.receive
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > MAX_REQUEST_BYTES:
+                        raise HTTPException(status_code=413, detail="Request body too large")
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
 
 
 router = APIRouter(
     prefix="/admin",
     tags=["admin"],
+    route_class=_LimitedBodyRoute,
 )
 
 
+@router.on_event("startup")
+async def _cleanup_uploads():
+    await _sweep_uploads(remove_all=True)
+    asyncio.create_task(_sweep_uploads_periodically())
+
+
 @router.post("/ingest")
 async def ingest(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(None),
+    files: List[UploadFile] = File(None),
     source: str = Form(...),
     text: Optional[str] = Form(None),
     role: str = Depends(get_current_role),
 ):
     """
-    Ingest a file (PDF, Markdown, text) or raw text into ChromaDB with the given source label.
+    Ingest one or more files (PDF, Markdown, text) and/or raw text into ChromaDB
+    with the given source label. All files in the request share one job.
     """
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
 
-    docs = []
-
-    temp_path = None
-    if file:
-        suffix = Path(file.filename).suffix.lower()
-        with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            temp_path = tmp.name
-
-    job_id = str(uuid.uuid4())
-    ingest_jobs[job_id] = {"status": "queued"}
-
-    background_tasks.add_task(_process_ingestion, job_id, temp_path, text, source)
+    incoming = ([file] if file else []) + (files or [])
+    if len(incoming) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} files per request")
+    uploads = []
+    try:
+        for upload in incoming:
+            uploads.append(await _save_upload(upload))
+    except BaseException:
+        for upload in uploads:
+            await run_in_threadpool(Path(upload["path"]).unlink, missing_ok=True)
+        raise
 
-    return {"status": "queued", "job_id": job_id}
+    return _queue_job(background_tasks, uploads, text, source)
 
 
 @router.get("/ingest/status/{job_id}")
 async def ingest_status(job_id: str):
     if job_id not in ingest_jobs:
         raise HTTPException(status_code=404, detail="Job not found")
-    return ingest_jobs[job_id]
\ No newline at end of file
+    return ingest_jobs[job_id]
+
+
+# Resumable uploads: create a session, PUT chunks at increasing offsets
+# (resuming from the offset reported by GET after a dropped connection),
+# then complete it to queue ingestion.
+
+@router.post("/ingest/uploads")
+async def create_upload(
+    filename: str = Form(...),
+    size: Optional[int] = Form(None),
+    role: str = Depends(get_current_role),
+):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"{filename} exceeds upload limit")
+
+    await _sweep_uploads()
+    await run_in_threadpool(UPLOAD_DIR.mkdir, parents=True, exist_ok=True)
+    upload_id = str(uuid.uuid4())
+    path = UPLOAD_DIR / f"{upload_id}{Path(filename).suffix.lower()}"
+    await run_in_threadpool(path.touch)
+    upload_sessions[upload_id] = {
+        "filename": filename,
+        "path": str(path),
+        "size": size,
+        "received": 0,
+        "hasher": hashlib.sha256(),
+        "lock": asyncio.Lock(),
+        "updated_at": time.time(),
+    }
+    return {"upload_id": upload_id, "offset": 0, "chunk_size": UPLOAD_CHUNK_BYTES}
+
+
+def _get_session(upload_id: str) -> dict:
+    if upload_id not in upload_sessions:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload_sessions[upload_id]
+
+
+@router.get("/ingest/uploads/{upload_id}")
+async def upload_status(upload_id: str, role: str = Depends(get_current_role)):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    session = _get_session(upload_id)
+    return {"upload_id": upload_id, "offset": session["received"], "size": session["size"]}
+
+
+@router.put("/ingest/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    role: str = Depends(get_current_role),
+):
+    """
+    Append the raw request body (at most UPLOAD_CHUNK_BYTES) to the upload,
+    which must start at `offset`.
+    """
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    session = _get_session(upload_id)
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > UPLOAD_CHUNK_BYTES:
+        raise HTTPException(status_code=413, detail=f"Chunks are limited to {UPLOAD_CHUNK_BYTES} bytes")
+
+    # Serialise chunks per session so two PUTs at the same offset can't both append
+    async with session["lock"]:
+        if upload_sessions.get(upload_id) is not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if offset != session["received"]:
+            raise HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": session["received"]})
+
+        # Buffer the chunk before touching the file so a dropped request leaves
+        # the session at its last good offset
+        hasher = session["hasher"].copy()
+        received = session["received"]
+        parts = []
+        async for part in request.stream():
+            received += len(part)
+            if received - offset > UPLOAD_CHUNK_BYTES:
+                raise HTTPException(status_code=413, detail=f"Chunks are limited to {UPLOAD_CHUNK_BYTES} bytes")
+            if received > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"{session['filename']} exceeds upload limit")
+            hasher.update(part)
+            parts.append(part)
+
+        def append():
+            with open(session["path"], "ab") as out:
+                out.writelines(parts)
+
+        await run_in_threadpool(append)
+        session["hasher"] = hasher
+        session["received"] = received
+        session["updated_at"] = time.time()
+    return {"upload_id": upload_id, "offset": received}
+
+
+@router.post("/ingest/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    source: str = Form(...),
+    role: str = Depends(get_current_role),
+):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    session = _get_session(upload_id)
+    async with session["lock"]:
+        if upload_sessions.get(upload_id) is not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if session["size"] is not None and session["received"] != session["size"]:
+            raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "offset": session["received"]})
+        upload_sessions.pop(upload_id)
+
+    upload = {
+        "path": session["path"],
+        "filename": session["filename"],
+        "sha256": session["hasher"].hexdigest(),
+        "size": session["received"],
+    }
+    return _queue_job(background_tasks, [upload], None, source)
+
+
+@router.delete("/ingest/uploads/{upload_id}")
+async def abort_upload(upload_id: str, role: str = Depends(get_current_role)):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    session = _get_session(upload_id)
+    async with session["lock"]:
+        if upload_sessions.pop(upload_id, None) is not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+    await run_in_threadpool(Path(session["path"]).unlink, missing_ok=True)
+    return {"status": "aborted", "upload_id": upload_id}
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+from app.lib import llm_gateway
+from app.lib.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError, StubBackend
+
+
+class SlowBackend:
+    def __init__(self, delay: float, text: str = "slow"):
+        self.delay = delay
+        self.text = text
+
+    def generate(self, prompt: str):
+        time.sleep(self.delay)
+        return self.text, 1
+
+
+class FailingBackend:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt: str):
+        self.calls += 1
+        raise RuntimeError("backend down")
+
+
+@pytest.fixture(autouse=True)
+def fast_timings(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_HEDGE_SECONDS", 0.1)
+    monkeypatch.setattr(llm_gateway, "LLM_TIMEOUT_SECONDS", 2)
+    monkeypatch.setattr(llm_gateway, "BREAKER_COOLDOWN_SECONDS", 0.2)
+
+
+def make_gateway(backends: dict, primary: str, secondary: str = "", routes=None) -> LLMGateway:
+    gateway = LLMGateway(primary=primary, secondary=secondary, routes=routes)
+    for name, backend in backends.items():
+        gateway._slot(name)._backend = backend
+    return gateway
+
+
+def test_stub_backend_is_deterministic():
+    prompt = "context\n\nQuestion: who is ishaan?\nHelpful Answer:"
+    assert StubBackend().generate(prompt) == StubBackend().generate(prompt)
+    assert StubBackend().generate(prompt)[0] == "[stub] who is ishaan?"
+
+
+def test_hedges_to_secondary_after_hedge_interval():
+    gateway = make_gateway({"slow": SlowBackend(1.0), "stub": StubBackend()}, "slow", "stub")
+
+    start = time.monotonic()
+    answer = gateway.generate("Question: hi")
+    elapsed = time.monotonic() - start
+
+    assert answer == "[stub] hi"
+    assert 0.1 <= elapsed < 0.5
+    assert gateway.metrics()["stub"]["hedged"] == 1
+
+
+def test_fails_over_immediately_when_primary_errors():
+    gateway = make_gateway({"bad": FailingBackend(), "stub": StubBackend()}, "bad", "stub")
+
+    start = time.monotonic()
+    assert gateway.generate("Question: hi") == "[stub] hi"
+    assert time.monotonic() - start < llm_gateway.LLM_HEDGE_SECONDS
+
+    metrics = gateway.metrics()
+    assert metrics["bad"]["errors"] == 1
+    assert metrics["stub"]["hedged"] == 0
+
+
+def test_demo_role_is_routed_to_its_backend():
+    gateway = make_gateway(
+        {"primary": SlowBackend(0, "primary"), "cheap": SlowBackend(0, "cheap")},
+        "primary",
+        routes={"demo": "cheap"},
+    )
+
+    assert gateway.generate("q", role="demo") == "cheap"
+    assert gateway.generate("q", role="trusted") == "primary"
+
+
+def test_all_backends_failing_raises():
+    gateway = make_gateway({"bad": FailingBackend(), "worse": FailingBackend()}, "bad", "worse")
+
+    with pytest.raises(LLMUnavailableError, match="All LLM backends failed"):
+        gateway.generate("q")
+
+
+def test_timeout_raises(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_TIMEOUT_SECONDS", 0.2)
+    gateway = make_gateway({"slow": SlowBackend(1.0)}, "slow")
+
+    with pytest.raises(LLMUnavailableError, match="timed out"):
+        gateway.generate("q")
+
+
+def test_single_backend_waits_for_a_free_slot(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_IN_FLIGHT", 2)
+    gateway = make_gateway({"slow": SlowBackend(0.2)}, "slow")
+    results = []
+
+    def call():
+        results.append(gateway.generate("q"))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["slow"] * 5
+
+
+def test_breaker_opens_then_allows_one_trial():
+    breaker = CircuitBreaker()
+    for _ in range(llm_gateway.BREAKER_MIN_CALLS):
+        assert breaker.acquire() == "closed"
+        breaker.record(False, "closed")
+    assert breaker.state == "open"
+    assert breaker.acquire() is None
+
+    # A late success from a call started before the breaker opened is ignored
+    breaker.record(True, "closed")
+    assert breaker.state == "open"
+
+    time.sleep(llm_gateway.BREAKER_COOLDOWN_SECONDS)
+    assert breaker.state == "half-open"
+    assert breaker.acquire() == "trial"
+    assert breaker.acquire() is None
+
+    breaker.record(True, "trial")
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker()
+    for _ in range(llm_gateway.BREAKER_MIN_CALLS):
+        breaker.record(False, "closed")
+    time.sleep(llm_gateway.BREAKER_COOLDOWN_SECONDS)
+
+    assert breaker.acquire() == "trial"
+    breaker.record(False, "trial")
+    assert breaker.state == "open"
+
+
+def test_open_breaker_skips_backend():
+    failing = FailingBackend()
+    gateway = make_gateway({"bad": failing, "stub": StubBackend()}, "bad", "stub")
+    for _ in range(llm_gateway.BREAKER_MIN_CALLS):
+        gateway.generate("Question: hi")
+    assert gateway.metrics()["bad"]["breaker"] == "open"
+
+    assert gateway.generate("Question: hi") == "[stub] hi"
+    assert failing.calls == llm_gateway.BREAKER_MIN_CALLS
+
+
+def test_metrics_track_tokens_and_latency():
+    gateway = make_gateway({"stub": StubBackend()}, "stub")
+    gateway.generate("Question: hi")
+
+    metrics = gateway.metrics()["stub"]
+    assert metrics["calls"] == 1
+    assert metrics["tokens"] > 0
+    assert metrics["latency_ms"]["p50"] is not None
@@ -0,0 +1,249 @@
+# Requires: pip install -r backend/requirements.txt (PDFs are read with PyMuPDF)
+"""
+Build or refresh the Chroma corpus from a directory or glob of PDFs,
+Markdown and text files.
+
+Files are parsed and chunked in a process pool, embedded in batches through
+an on-disk embedding cache, and written to the same collection with the same
+metadata (source, content_hash) as the /admin/ingest job. A manifest of
+path -> hash/chunk ids is kept next to the store so reruns only touch files
+that were added, changed or (with --prune) removed.
+
+    python scripts/build_corpus.py docs/
+    python scripts/build_corpus.py "corpus/**/*.pdf" --source corpus --prune
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+BASE = Path(__file__).parent.parent.resolve()  # project root
+sys.path.insert(0, str(BASE / "backend"))
+
+from app.lib.documents import SUPPORTED_SUFFIXES, file_sha256, load_documents, split_documents  # noqa: E402
+
+PERSIST_DIR = BASE / "backend" / "app" / "data" / "chroma_db"
+CACHE_DIR = BASE / "backend" / "app" / "data" / "embedding_cache"
+
+
+def collect_files(inputs):
+    files = set()
+    for pattern in inputs:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = path.rglob("*")
+        else:
+            candidates = (Path(p) for p in glob.glob(pattern, recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in SUPPORTED_SUFFIXES:
+                files.add(str(candidate.resolve()))
+    return sorted(files)
+
+
+def parse_file(path: str, sha256: str, source: str):
+    """Worker: load and chunk one file. Runs in a child process."""
+    docs = load_documents(path)
+    for doc in docs:
+        doc.metadata["content_hash"] = sha256
+    chunks = split_documents(docs, source)
+    return path, chunks
+
+
+def build_store(persist_dir: Path, cache_dir: Path):
+    from langchain.embeddings import CacheBackedEmbeddings
+    from langchain.storage import LocalFileStore
+    from langchain_community.vectorstores import Chroma
+    from langchain_openai import OpenAIEmbeddings
+
+    underlying = OpenAIEmbeddings()
+    # Cache by chunk text so refreshes only pay for chunks that actually changed
+    embeddings = CacheBackedEmbeddings.from_bytes_store(
+        underlying, LocalFileStore(str(cache_dir)), namespace=underlying.model
+    )
+    return Chroma(persist_directory=str(persist_dir), embedding_function=embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the Chroma corpus.")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of PDF/Markdown/text files")
+    parser.add_argument("--source", help="Source label for every chunk (default: the file name)")
+    parser.add_argument("--persist-dir", type=Path, default=PERSIST_DIR)
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--manifest", type=Path, help="Manifest path (default: <persist-dir>/corpus_manifest.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding/write batch")
+    parser.add_argument("--prune", action="store_true", help="Remove chunks for manifest files no longer in the inputs")
+    parser.add_argument("--full", action="store_true", help="Reindex every file even if unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    manifest_path = args.manifest or args.persist_dir / "corpus_manifest.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    started = time.perf_counter()
+
+    # 1) Work out what changed
+    files = collect_files(args.inputs)
+    hashes = {path: file_sha256(path) for path in files}
+    removed = [path for path in manifest if path not in hashes] if args.prune else []
+    # Files whose content changed always lose their old chunks and entry,
+    # even if the new content turns out to duplicate another file
+    changed = [path for path in files
+               if path in manifest and (manifest[path]["sha256"] != hashes[path] or args.full)]
+    staying = {path for path in manifest if path not in removed and path not in changed}
+
+    unchanged, added, updated = [], [], []
+    for path in files:
+        if path in staying:
+            copy_of = manifest[path].get("duplicate_of")
+            # A duplicate whose indexed copy is going away has to be indexed itself
+            if copy_of and copy_of != "api" and copy_of not in staying:
+                changed.append(path)
+                staying.discard(path)
+                updated.append(path)
+            else:
+                unchanged.append(path)
+        else:
+            (updated if path in manifest else added).append(path)
+
+    # Hashes that will be indexed after this run, and the path holding them
+    indexed = {manifest[path]["sha256"]: path for path in staying if manifest[path]["ids"]}
+    to_index, duplicates = [], {}
+    for path in sorted(added + updated):
+        if hashes[path] in indexed:
+            duplicates[path] = indexed[hashes[path]]
+        else:
+            indexed[hashes[path]] = path
+            to_index.append(path)
+
+    print(f"Found {len(files)} files: {len([p for p in added if p not in duplicates])} added, "
+          f"{len([p for p in updated if p not in duplicates])} updated, {len(unchanged)} unchanged, "
+          f"{len(duplicates)} duplicate, {len(removed)} removed")
+    if args.dry_run:
+        return
+
+    db = build_store(args.persist_dir, args.cache_dir)
+
+    def save_manifest():
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp, manifest_path)
+
+    # Files skipped because the API had already ingested them are rechecked,
+    # since those chunks can be deleted outside this script
+    for path in unchanged[:]:
+        if manifest[path].get("duplicate_of") == "api":
+            if not db.get(where={"content_hash": hashes[path]}, limit=1)["ids"]:
+                unchanged.remove(path)
+                manifest.pop(path)
+                updated.append(path)
+                to_index.append(path)
+
+    # 2) Drop stale chunks for changed/removed files. Their manifest entries go
+    # with them, so an interrupted run just sees those files as new next time.
+    stale_ids = [cid for path in changed + removed for cid in manifest[path]["ids"]]
+    if stale_ids:
+        db.delete(ids=stale_ids)
+    for path in changed + removed:
+        manifest.pop(path)
+    save_manifest()
+
+    # 3) Parse + chunk in parallel, embed + write in batches as results arrive.
+    # A file enters the manifest only once all of its chunks are written, and
+    # the manifest is saved after every batch.
+    parse_started = time.perf_counter()
+    num_chunks = 0
+    batch, batch_ids, batch_paths = [], [], []
+    remaining = {}
+    entries = {}
+    embed_seconds = 0.0
+
+    def flush():
+        nonlocal embed_seconds
+        if not batch:
+            return
+        t = time.perf_counter()
+        db.add_documents(batch, ids=batch_ids)
+        embed_seconds += time.perf_counter() - t
+        for path in batch_paths:
+            remaining[path] -= 1
+            if remaining[path] == 0:
+                manifest[path] = entries.pop(path)
+        batch.clear()
+        batch_ids.clear()
+        batch_paths.clear()
+        save_manifest()
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(parse_file, path, hashes[path], args.source or Path(path).name): path
+            for path in to_index
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                _, chunks = future.result()
+            except Exception as e:
+                print(f"  failed {path}: {e}", file=sys.stderr)
+                failed.append(path)
+                continue
+
+            # Chunks with this hash may already be in Chroma, from the API or
+            # from an interrupted run. Only a complete set counts as a duplicate;
+            # leftovers of a partial write are cleared and the file reindexed.
+            existing = db.get(where={"content_hash": hashes[path]}, include=[])["ids"]
+            if chunks and len(existing) >= len(chunks):
+                duplicates[path] = "api"
+                manifest[path] = {"sha256": hashes[path], "ids": [], "duplicate_of": "api"}
+                continue
+            if existing:
+                db.delete(ids=existing)
+
+            ids = [f"{hashes[path]}:{i}" for i in range(len(chunks))]
+            entries[path] = {"sha256": hashes[path], "ids": ids}
+            remaining[path] = len(chunks)
+            if not chunks:
+                manifest[path] = entries.pop(path)
+            num_chunks += len(chunks)
+            for chunk, cid in zip(chunks, ids):
+                batch.append(chunk)
+                batch_ids.append(cid)
+                batch_paths.append(path)
+                if len(batch) >= args.batch_size:
+                    flush()
+        flush()
+
+    # Record duplicates so reruns skip them, unless their copy failed to index
+    for path, copy_of in duplicates.items():
+        if copy_of != "api" and copy_of not in failed:
+            manifest[path] = {"sha256": hashes[path], "ids": [], "duplicate_of": copy_of}
+
+    if hasattr(db, "persist"):
+        db.persist()
+    save_manifest()
+
+    # 4) Report
+    elapsed = time.perf_counter() - started
+    num_indexed = len(to_index) - len(failed) - sum(1 for p in to_index if duplicates.get(p) == "api")
+    print(f"Indexed {num_indexed} files / {num_chunks} chunks in {elapsed:.1f}s "
+          f"({num_indexed / elapsed:.1f} files/s, {num_chunks / elapsed:.1f} chunks/s; "
+          f"parse+embed {time.perf_counter() - parse_started:.1f}s, of which embed/write {embed_seconds:.1f}s)")
+    added = [path for path in added if path not in failed and path not in duplicates]
+    updated = [path for path in updated if path not in failed and path not in duplicates]
+    for label, paths in (("added", added), ("updated", updated), ("removed", removed), ("failed", failed)):
+        for path in paths:
+            print(f"  {label:<9} {path}")
+    for path, copy_of in sorted(duplicates.items()):
+        print(f"  duplicate {path} (of {copy_of})")
+    print(f"Manifest written to {manifest_path}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()